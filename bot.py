@@ -12,16 +12,44 @@ Features:
 
 import os
 import asyncio
+import logging
+import logging.handlers
+import queue
+import signal
+import sqlite3
 from datetime import datetime
-from typing import Optional, List, Dict, Any
+from typing import Optional, List, Dict, Any, Sequence, Set, Tuple, Union
 
 import discord
 from discord.ext import commands
+from cachetools import TTLCache
 
-from database import db, save_message, get_relevant_context, get_message
-from translator import translate_with_context, TranslationError
+from database import (
+    db,
+    MESSAGE_FIELDS,
+    MessageRow,
+    timestamp_us,
+    save_messages_bulk,
+    asave_messages_bulk,
+    adelete_old_messages,
+    avacuum,
+    aget_relevant_context,
+    aget_recent_messages,
+    shutdown_writer,
+)
+from translator import (
+    translate_with_context,
+    TranslationError,
+    ContextMessage,
+    filter_context_with_ai,
+    init_session,
+    close_session,
+)
+import translator_cache
 
 
+logger = logging.getLogger("bot")
+
 # Configuration from environment variables
 DISCORD_TOKEN = os.getenv("DISCORD_TOKEN")
 TRANSLATION_EMOJI = "🌐"
@@ -30,9 +58,114 @@ FLAG_TO_LANG = {
     "🇯🇵": "ja",
     "🇬🇧": "en"
 }
+# Every reaction that triggers a translation, mapped to its target language
+# (None = auto-detect); resolved with a single dict probe per reaction
+_TRIGGER_TO_LANG: Dict[str, Optional[str]] = {TRANSLATION_EMOJI: None, **FLAG_TO_LANG}
+# Default for non-trigger emoji; no language code is empty
+_NOT_A_TRIGGER = ""
+# Verbose per-message/per-request logging
+BOT_DEBUG = os.getenv("BOT_DEBUG", "0") == "1"
 # Optional: restrict to specific channels (comma-separated IDs)
-ALLOWED_CHANNELS = os.getenv("ALLOWED_CHANNELS", "").split(",")
-ALLOWED_CHANNELS = [c.strip() for c in ALLOWED_CHANNELS if c.strip()]
+ALLOWED_CHANNELS = frozenset(
+    int(c) for c in os.getenv("ALLOWED_CHANNELS", "").split(",") if c.strip()
+)
+
+# Message persistence batching: flush after this many rows or this many seconds
+WRITE_BATCH_SIZE = 100
+WRITE_BATCH_INTERVAL = 0.2
+
+# Reply in a thread (1) or inline (0); threads are only used for longer responses
+USE_THREADS = os.getenv("USE_THREADS", "1") == "1"
+THREAD_MIN_LENGTH = int(os.getenv("THREAD_MIN_LENGTH", "500"))
+
+# Database maintenance: daily cleanup keeping 7 days of history, weekly VACUUM
+CLEANUP_INTERVAL = 86400  # 24 hours
+MESSAGE_RETENTION_DAYS = 7
+VACUUM_EVERY_N_CLEANUPS = 7
+
+# Placeholder values the model uses for "nothing to add" in optional sections
+_SKIP_SENTINELS = frozenset({"none", "n/a", "-", "无", ""})
+
+# Thread names must be a single line
+_NL_TO_SPACE = str.maketrans("\n\r\t", "   ")
+
+# Translation result sections shown in responses: (title, result key, skip placeholders)
+_RESULT_FIELDS = (
+    ("📝 Translation", "translation", False),
+    ("📚 Context / Term Explanation", "context_explanation", True),
+    ("🎭 Tone Notes", "tone_notes", True),
+)
+
+# Only user-authored message types are stored as translation context
+_PERSISTED_MESSAGE_TYPES = frozenset({discord.MessageType.default, discord.MessageType.reply})
+
+# Number of context messages retrieved for a translation request
+CONTEXT_LIMIT = 10
+
+# Discord embed field value limit
+EMBED_FIELD_LIMIT = 1024
+
+
+def _truncate(text: str, limit: int = EMBED_FIELD_LIMIT) -> str:
+    """Shorten text to fit within limit characters, marking the cut with '...'."""
+    if len(text) <= limit:
+        return text
+    return text[:limit - 3] + "..."
+
+
+def _is_meaningful(text: str) -> bool:
+    """Check whether an optional section has real content rather than a placeholder."""
+    return text.strip().lower() not in _SKIP_SENTINELS
+
+
+def _result_sections(result: Dict[str, Any]) -> List[Tuple[str, str, str]]:
+    """
+    Get the sections of a translation result worth showing.
+    
+    Returns:
+        List of (result_key, title, text) tuples in _RESULT_FIELDS order,
+        skipping empty sections and notes the model filled with a placeholder
+    """
+    sections = []
+    for title, key, skip_placeholders in _RESULT_FIELDS:
+        text = (result.get(key) or "").strip()
+        if not text:
+            continue
+        if skip_placeholders and not _is_meaningful(text):
+            continue
+        sections.append((key, title, text))
+    return sections
+
+
+def _is_context_message(message: discord.Message) -> bool:
+    """Check whether a message is useful as translation context."""
+    # Attachment/embed/sticker-only and system messages are useless as context
+    if message.type not in _PERSISTED_MESSAGE_TYPES:
+        return False
+    return bool(message.content) and not message.content.isspace()
+
+
+def _message_to_row(message: discord.Message) -> MessageRow:
+    """
+    Convert a Discord message to a database row.
+    
+    The layout matches database.save_messages_bulk and MESSAGE_FIELDS.
+    """
+    channel = message.channel
+    # Extract thread ID if message is in a thread
+    thread_id = channel.id if isinstance(channel, discord.Thread) else None
+    
+    return (
+        message.id,
+        message.author.id,
+        message.author.display_name,
+        message.content,
+        timestamp_us(message.created_at),
+        channel.id,
+        thread_id,
+        message.guild.id if message.guild else None
+    )
+
 
 # Intents configuration
 intents = discord.Intents.default()
@@ -55,33 +188,125 @@ class AITranslatorBot(commands.Bot):
             help_command=None
         )
         self.db = db
+        # Messages waiting to be persisted by the writer task
+        self._write_queue: "asyncio.Queue[MessageRow]" = asyncio.Queue()
+        # Recently retrieved translation context, keyed by (channel_id, message_id, limit)
+        self._ctx_cache = TTLCache(maxsize=512, ttl=60)
+        # Messages and users fetched over REST, to skip repeat round-trips
+        self._message_cache = TTLCache(maxsize=2048, ttl=300)
+        self._user_cache = TTLCache(maxsize=2048, ttl=300)
+        # Translation results, keyed by (message_id, target_lang, edited_at)
+        self._translation_cache = TTLCache(maxsize=512, ttl=3600)
+        # (message_id, target_lang) pairs with a translation currently running
+        self._in_flight: Set[Tuple[int, Optional[str]]] = set()
     
-    async def setup_hook(self):
+    async def setup_hook(self) -> None:
         """Called when the bot is starting up."""
-        print(f"[Bot] Logged in as {self.user} (ID: {self.user.id})")
-        # Start cleanup task
+        logger.info("Logged in as %s (ID: %s)", self.user, self.user.id)
+        # Open the pooled HTTP client used for translation API calls
+        await init_session()
+        # Start cleanup and message writer tasks
         self.loop.create_task(self._periodic_cleanup())
-        print("[Bot] AI Translator Bot is ready!")
+        self.loop.create_task(self._writer_loop())
+        # docker stop sends SIGTERM; shut down cleanly so queued messages are flushed
+        try:
+            self.loop.add_signal_handler(signal.SIGTERM, lambda: self.loop.create_task(self.close()))
+        except NotImplementedError:
+            pass  # Signal handlers are unavailable on Windows event loops
+        logger.info("AI Translator Bot is ready!")
 
-    async def _periodic_cleanup(self):
+    async def close(self) -> None:
+        """Shut down the bot, then close the translation HTTP client."""
+        try:
+            await super().close()
+        finally:
+            await close_session()
+
+    async def _writer_loop(self) -> None:
+        """
+        Persist queued messages in batches.
+        
+        Waits for the first queued row, then keeps collecting until
+        WRITE_BATCH_SIZE rows are pending or WRITE_BATCH_INTERVAL has
+        elapsed, and writes the whole batch in one transaction.
+        """
+        while True:
+            rows = [await self._write_queue.get()]
+            try:
+                deadline = self.loop.time() + WRITE_BATCH_INTERVAL
+                while len(rows) < WRITE_BATCH_SIZE:
+                    try:
+                        rows.append(self._write_queue.get_nowait())
+                        continue
+                    except asyncio.QueueEmpty:
+                        pass
+                    timeout = deadline - self.loop.time()
+                    if timeout <= 0:
+                        break
+                    try:
+                        rows.append(await asyncio.wait_for(self._write_queue.get(), timeout))
+                    except asyncio.TimeoutError:
+                        break
+            except asyncio.CancelledError:
+                # Hand the partial batch back so the shutdown flush can persist it
+                for row in rows:
+                    self._write_queue.put_nowait(row)
+                raise
+            try:
+                saved = await asave_messages_bulk(rows)
+            except asyncio.CancelledError:
+                # A save still queued behind cleanup on the writer thread is
+                # dropped with the task; re-saving is harmless (INSERT OR REPLACE),
+                # so hand the batch back to the shutdown flush
+                for row in rows:
+                    self._write_queue.put_nowait(row)
+                raise
+            except Exception as e:
+                logger.error("Error saving %d messages: %s", len(rows), e)
+                continue
+            self._log_write_result(len(rows), saved)
+
+    @staticmethod
+    def _log_write_result(count: int, saved: bool) -> None:
+        """Log the outcome of a batched message write."""
+        if saved:
+            logger.debug("Saved %d messages", count)
+        else:
+            logger.warning("Failed to save %d messages", count)
+
+    def flush_write_queue(self) -> None:
+        """Synchronously persist any messages still waiting in the queue."""
+        rows = []
+        while not self._write_queue.empty():
+            rows.append(self._write_queue.get_nowait())
+        if rows:
+            self._log_write_result(len(rows), save_messages_bulk(rows))
+
+    async def _periodic_cleanup(self) -> None:
         """Periodically delete old messages from database."""
+        runs = 0
         while not self.is_closed():
             try:
-                # Cleanup every 24 hours, keep 7 days of history
-                print("[Bot] Running database cleanup...")
-                deleted = self.db.delete_old_messages(days=7)
-                print(f"[Bot] Cleaned up {deleted} old messages")
+                # Runs on the database writer thread, in turn with message writes;
+                # deletes are batched into short transactions
+                logger.info("Running database cleanup...")
+                deleted = await adelete_old_messages(MESSAGE_RETENTION_DAYS)
+                logger.info("Cleaned up %d old messages", deleted)
+                
+                runs += 1
+                if runs % VACUUM_EVERY_N_CLEANUPS == 0:
+                    await avacuum()
             except Exception as e:
-                print(f"[Bot] Error during cleanup: {e}")
-            await asyncio.sleep(86400) # 24 hours
+                logger.error("Error during cleanup: %s", e)
+            await asyncio.sleep(CLEANUP_INTERVAL)
     
-    async def on_ready(self):
+    async def on_ready(self) -> None:
         """Called when the bot has connected to Discord."""
-        print(f"[Bot] Connected to {len(self.guilds)} guilds")
+        logger.info("Connected to %d guilds", len(self.guilds))
         for guild in self.guilds:
-            print(f"  - {guild.name} (ID: {guild.id})")
+            logger.info("  - %s (ID: %s)", guild.name, guild.id)
     
-    async def on_message(self, message: discord.Message):
+    async def on_message(self, message: discord.Message) -> None:
         """
         Handle incoming messages - save to database for context.
         
@@ -93,7 +318,7 @@ class AITranslatorBot(commands.Bot):
             return
         
         # Check if channel is allowed
-        if ALLOWED_CHANNELS and str(message.channel.id) not in ALLOWED_CHANNELS:
+        if ALLOWED_CHANNELS and message.channel.id not in ALLOWED_CHANNELS:
             return
 
         # Save message to database
@@ -102,136 +327,237 @@ class AITranslatorBot(commands.Bot):
         # Process commands (if any)
         await self.process_commands(message)
     
-    async def _save_message_to_db(self, message: discord.Message):
-        """Save a Discord message to the SQLite database."""
-        try:
-            # Extract thread ID if message is in a thread
-            thread_id = None
-            if isinstance(message.channel, discord.Thread):
-                thread_id = str(message.channel.id)
-            
-            # Format timestamp as ISO string
-            timestamp = message.created_at.isoformat()
-            
-            # Save to database
-            success = save_message(
-                msg_id=str(message.id),
-                user_id=str(message.author.id),
-                user_name=message.author.display_name,
-                content=message.content,
-                timestamp=timestamp,
-                channel_id=str(message.channel.id),
-                thread_id=thread_id,
-                guild_id=str(message.guild.id) if message.guild else None
-            )
+    async def _save_message_to_db(self, message: discord.Message) -> None:
+        """Queue a Discord message for batched persistence to SQLite."""
+        if not _is_context_message(message):
+            return
+        await self._write_queue.put(_message_to_row(message))
+    
+    def _get_cached_channel_context(
+        self,
+        channel_id: int,
+        before_id: int,
+        limit: int
+    ) -> List[ContextMessage]:
+        """
+        Get recent context for a channel from discord.py's in-memory message cache.
+        
+        Args:
+            channel_id: Discord channel ID
+            before_id: Only messages older than this message ID are returned
+            limit: Maximum number of messages
             
-            if success:
-                print(f"[Bot] Saved message {message.id} from {message.author.display_name}")
-            else:
-                print(f"[Bot] Failed to save message {message.id}")
-                
-        except Exception as e:
-            print(f"[Bot] Error saving message {message.id}: {e}")
+        Returns:
+            List of message dicts in the database schema, ordered newest first
+        """
+        context: List[ContextMessage] = []
+        for cached in reversed(self.cached_messages):
+            if cached.channel.id != channel_id or cached.id >= before_id:
+                continue
+            if cached.author.bot or not _is_context_message(cached):
+                continue
+            context.append(dict(zip(MESSAGE_FIELDS, _message_to_row(cached))))
+            if len(context) >= limit:
+                break
+        return context
+    
+    async def _get_relevant_context(
+        self,
+        channel_id: int,
+        message_id: int,
+        limit: int = CONTEXT_LIMIT
+    ) -> List[sqlite3.Row]:
+        """
+        Get context messages for a translation request, using the TTL cache.
+        
+        Context only includes messages up to the target message, so entries
+        are not invalidated by newer messages and simply expire. Empty results
+        are not cached since the target may still be waiting in the write queue.
+        """
+        key = (channel_id, message_id, limit)
+        raw_context = self._ctx_cache.get(key)
+        if raw_context is None:
+            raw_context = await aget_relevant_context(message_id, limit)
+            if raw_context:
+                self._ctx_cache[key] = raw_context
+        return raw_context
     
-    async def on_raw_reaction_add(self, payload: discord.RawReactionActionEvent):
+    async def on_raw_reaction_add(self, payload: discord.RawReactionActionEvent) -> None:
         """
         Handle reaction add events - trigger translation on 🌐 or flag emojis.
         
         Uses raw reaction event to catch reactions on messages not in cache.
         """
-        emoji_str = str(payload.emoji)
-        print(f"[Debug] Reaction added: {emoji_str}")
-        target_lang = None
-        
-        # Check if it's the default translation emoji
-        if emoji_str == TRANSLATION_EMOJI:
-            target_lang = None # Use auto-detection or default to English
-        # Check if it's a flag emoji for specific language
-        elif emoji_str in FLAG_TO_LANG:
-            target_lang = FLAG_TO_LANG[emoji_str]
-        else:
+        # Triggers are unicode emoji, whose name is the emoji itself; custom
+        # emoji names are plain identifiers and can never match
+        # 🌐 maps to None: use auto-detection or default to English
+        target_lang = _TRIGGER_TO_LANG.get(payload.emoji.name, _NOT_A_TRIGGER)
+        if target_lang == _NOT_A_TRIGGER:
             return
         
         # Ignore bot's own reactions
         if payload.user_id == self.user.id:
             return
         
-        print(f"[Bot] Translation triggered for message {payload.message_id} by user {payload.user_id} (Target: {target_lang or 'Auto'})")
+        logger.info(
+            "Translation triggered for message %s by user %s (Target: %s)",
+            payload.message_id, payload.user_id, target_lang or "Auto"
+        )
         
         # Process translation request
         await self._handle_translation_request(payload, target_lang=target_lang)
     
-    async def _handle_translation_request(self, payload: discord.RawReactionActionEvent, target_lang: Optional[str] = None):
+    async def on_raw_message_edit(self, payload: discord.RawMessageUpdateEvent) -> None:
+        """Drop edited messages from the fetch cache so translations see new content."""
+        self._message_cache.pop(payload.message_id, None)
+    
+    async def on_raw_message_delete(self, payload: discord.RawMessageDeleteEvent) -> None:
+        """Drop deleted messages from the fetch cache."""
+        self._message_cache.pop(payload.message_id, None)
+    
+    async def on_raw_bulk_message_delete(self, payload: discord.RawBulkMessageDeleteEvent) -> None:
+        """Drop bulk-deleted messages from the fetch cache."""
+        for message_id in payload.message_ids:
+            self._message_cache.pop(message_id, None)
+    
+    async def _get_or_fetch_message(
+        self,
+        channel: discord.abc.Messageable,
+        message_id: int
+    ) -> discord.Message:
+        """
+        Get a message from the fetch cache, falling back to a REST fetch.
+        
+        Raises:
+            discord.NotFound: The message does not exist
+            discord.Forbidden: The bot cannot read the channel history
+        """
+        message = self._message_cache.get(message_id)
+        if message is None:
+            message = await channel.fetch_message(message_id)
+            self._message_cache[message_id] = message
+        return message
+    
+    async def _get_or_fetch_user(self, user_id: int) -> Optional[discord.User]:
+        """
+        Get a user from the client or fetch cache, falling back to a REST fetch.
+        
+        Returns:
+            The user, or None if it could not be fetched
+        """
+        user = self.get_user(user_id) or self._user_cache.get(user_id)
+        if user is None:
+            try:
+                user = await self.fetch_user(user_id)
+            except discord.HTTPException:
+                return None
+            self._user_cache[user_id] = user
+        return user
+    
+    async def _get_requesting_user(
+        self,
+        payload: discord.RawReactionActionEvent
+    ) -> Optional[Union[discord.Member, discord.User]]:
+        """Get the user who added a reaction; guild reactions already carry the member."""
+        if payload.member is not None:
+            return payload.member
+        return await self._get_or_fetch_user(payload.user_id)
+    
+    async def _handle_translation_request(self, payload: discord.RawReactionActionEvent, target_lang: Optional[str] = None) -> None:
         """
         Handle a translation request triggered by reaction.
         
         Steps:
-        1. Fetch the message to be translated
-        2. Retrieve recent context from database
+        1. Fetch the message and requesting user concurrently
+        2. Reuse a cached translation, or retrieve recent context from database
         3. Apply AI-based topic filtering
         4. Call translation API with enhanced output
         5. Send formatted translation response
+        
+        Reactions for a message/language pair that is already being translated
+        are dropped; the in-flight request posts the shared response.
         """
+        request_key = (payload.message_id, target_lang)
+        if request_key in self._in_flight:
+            logger.debug("Translation of message %s to %s already in progress", payload.message_id, target_lang or "Auto")
+            return
+        self._in_flight.add(request_key)
+        
         try:
-            # Get the channel
-            channel = self.get_channel(payload.channel_id)
-            if not channel:
-                print(f"[Bot] Channel {payload.channel_id} not found")
-                return
+            # Get the channel; uncached channels (e.g. archived threads) only need
+            # a partial messageable to fetch and reply without extra lookups
+            channel = self.get_channel(payload.channel_id) or self.get_partial_messageable(
+                payload.channel_id, guild_id=payload.guild_id
+            )
             
-            # Fetch the message to translate
-            try:
-                message = await channel.fetch_message(payload.message_id)
-            except discord.NotFound:
-                print(f"[Bot] Message {payload.message_id} not found")
+            # Fetch the message and the requesting user concurrently
+            message, user = await asyncio.gather(
+                self._get_or_fetch_message(channel, payload.message_id),
+                self._get_requesting_user(payload),
+                return_exceptions=True
+            )
+            if isinstance(message, discord.NotFound):
+                logger.warning("Message %s not found", payload.message_id)
                 return
-            except discord.Forbidden:
-                print(f"[Bot] No permission to fetch message {payload.message_id}")
+            if isinstance(message, discord.Forbidden):
+                logger.warning("No permission to fetch message %s", payload.message_id)
                 return
-            
-            # Get user who triggered the translation
-            user = self.get_user(payload.user_id)
-            if not user:
-                try:
-                    user = await self.fetch_user(payload.user_id)
-                except:
-                    user = None
+            if isinstance(message, BaseException):
+                raise message
+            if isinstance(user, BaseException):
+                raise user
             
             user_name = user.display_name if user else f"User {payload.user_id}"
             
-            print(f"[Bot] Translating message from {message.author.display_name} for {user_name} to {target_lang or 'Auto'}")
+            logger.info(
+                "Translating message from %s for %s to %s",
+                message.author.display_name, user_name, target_lang or "Auto"
+            )
             
-            # Show typing status to give user feedback
-            async with channel.typing():
-                # Step 1: Retrieve raw context from database
-                raw_context = get_relevant_context(str(message.id), limit=10)
-                print(f"[Bot] Retrieved {len(raw_context)} raw context messages")
-                
-                # Step 2: Apply AI-based topic filtering and translation
-                translation_result = await translate_with_context(
-                    message.content,
-                    raw_context,
-                    target_lang=target_lang
-                )
+            # Reuse an earlier translation of this message, or a recent one of the
+            # same text in this channel
+            translation_key = (message.id, target_lang, message.edited_at)
+            translation_result = self._translation_cache.get(translation_key)
+            if translation_result is None:
+                translation_result = translator_cache.lookup(payload.channel_id, message.content, target_lang)
+            
+            if translation_result is None:
+                # Context is only needed when the model is called
+                raw_context = await self._get_relevant_context(payload.channel_id, payload.message_id)
+                logger.debug("Retrieved %d raw context messages", len(raw_context))
                 
-                # Step 3: Send the enhanced translation response
-                await self._send_translation_response(
-                    channel, 
-                    message, 
-                    translation_result, 
-                    user
-                )
+                # Show typing status only while waiting on the model
+                async with channel.typing():
+                    # Apply AI-based topic filtering and translation
+                    translation_result = await translate_with_context(
+                        message.content,
+                        raw_context,
+                        target_lang=target_lang
+                    )
+                translator_cache.put(payload.channel_id, message.content, target_lang, translation_result)
+            else:
+                logger.debug("Using cached translation for message %s", message.id)
+            if not translation_result.get("error"):
+                self._translation_cache[translation_key] = translation_result
+            
+            # Send the enhanced translation response
+            await self._send_translation_response(
+                channel, 
+                message, 
+                translation_result, 
+                user
+            )
             
         except Exception as e:
-            print(f"[Bot] Error handling translation request: {e}")
-            import traceback
-            traceback.print_exc()
+            logger.exception("Error handling translation request: %s", e)
+        finally:
+            self._in_flight.discard(request_key)
     
     async def _filter_context_by_topic(
         self, 
         target_content: str, 
-        raw_context: List[Dict[str, Any]]
-    ) -> List[Dict[str, Any]]:
+        raw_context: Sequence[ContextMessage]
+    ) -> Sequence[ContextMessage]:
         """
         Filter context messages using AI semantic analysis.
         
@@ -245,30 +571,28 @@ class AITranslatorBot(commands.Bot):
         Returns:
             Filtered list of relevant context messages
         """
-        from translator import filter_context_with_ai
-        
-        print(f"[TopicFilter] Filtering {len(raw_context)} messages for relevance...")
-        print(f"[TopicFilter] Target message: {target_content[:100]}...")
+        logger.debug("Topic filter: filtering %d messages for relevance...", len(raw_context))
+        logger.debug("Topic filter: target message: %.100s...", target_content)
         
         filtered = await filter_context_with_ai(target_content, raw_context)
         
-        print(f"[TopicFilter] Retained {len(filtered)} relevant messages")
-        if filtered:
-            print(f"[TopicFilter] Relevant context:")
+        logger.debug("Topic filter: retained %d relevant messages", len(filtered))
+        if filtered and logger.isEnabledFor(logging.DEBUG):
+            logger.debug("Topic filter: relevant context:")
             for ctx in filtered:
-                print(f"  - {ctx['user_name']}: {ctx['content'][:50]}...")
+                logger.debug("  - %s: %.50s...", ctx['user_name'], ctx['content'])
         
         return filtered
     
     async def _send_translation_response(
         self,
-        channel: discord.TextChannel,
+        channel: discord.abc.Messageable,
         message: discord.Message,
         translation_result: Dict[str, Any],
-        requesting_user: Optional[discord.User]
-    ):
+        requesting_user: Optional[Union[discord.Member, discord.User]]
+    ) -> None:
         """
-        Send translation response in a thread for cleaner interaction.
+        Send translation response, in a thread for longer responses.
         """
         # Check for errors
         if translation_result.get("error"):
@@ -276,56 +600,53 @@ class AITranslatorBot(commands.Bot):
             return
         
         # Determine the response title and content
-        # Note: 'translation' key might be renamed to 'response' for non-translation tasks in prompt
-        is_task = "Response" in translation_result.get("translation", "") or \
-                  "Response" in translation_result.get("original", "")
+        # The translator reports whether the model answered a task ([Response]) or translated
+        is_task = translation_result.get("kind") == "task"
         
         title = "📄 **Task Response**" if is_task else "🌐 **Translation**"
         
         # Prepare content string
         # We move away from Embeds to avoid the 'quote block' look
-        response_text = f"{title} (Original by {message.author.display_name})\n\n"
-        
-        translation_text = translation_result["translation"]
-        if translation_text:
-            response_text += f"{translation_text}\n"
+        parts = [f"{title} (Original by {message.author.display_name})\n\n"]
         
-        # Add context/term explanation only if significant
-        context_exp = translation_result.get("context_explanation", "").strip()
-        if context_exp and context_exp.lower() not in ["none", "n/a", "-", "无"]:
-            response_text += f"\n**📚 Context / Term Explanation**\n{context_exp}\n"
-        
-        # Add tone notes only if significant
-        tone_notes = translation_result.get("tone_notes", "").strip()
-        if tone_notes and tone_notes.lower() not in ["none", "n/a", "-", "无"]:
-            response_text += f"\n**🎭 Tone Notes**\n{tone_notes}\n"
+        # The translation itself goes first without a heading; notes only if significant
+        for key, section_title, section_text in _result_sections(translation_result):
+            if key == "translation":
+                parts.append(f"{section_text}\n")
+            else:
+                parts.append(f"\n**{section_title}**\n{section_text}\n")
         
         # Footer (Simplified, no longer using a heavy separator)
-        response_text += f"\n\n*Requested by {requesting_user.display_name if requesting_user else 'Unknown'}*"
+        parts.append(f"\n\n*Requested by {requesting_user.display_name if requesting_user else 'Unknown'}*")
+        response_text = "".join(parts)
         
         # Send the response
-        try:
-            # Create a thread for the translation to keep channel clean and allow follow-ups
-            # Limit thread name length
-            safe_content = (message.content[:40] + '...') if len(message.content) > 40 else message.content
-            thread_name = f"Translation: {safe_content}".replace("\n", " ")
-            
-            # If we are already in a thread, just send the message
-            if isinstance(channel, discord.Thread):
-                await channel.send(response_text)
-            else:
+        # If we are already in a thread, just send the message
+        if isinstance(channel, discord.Thread):
+            await channel.send(response_text)
+        elif USE_THREADS and len(response_text) > THREAD_MIN_LENGTH:
+            try:
+                # Create a thread for the translation to keep channel clean and allow follow-ups
+                # Limit thread name length
+                content = message.content
+                safe_content = content[:40].translate(_NL_TO_SPACE)
+                thread_name = f"Translation: {safe_content}{'...' if len(content) > 40 else ''}"
+                
                 # Create a public thread attached to the original message
                 thread = await message.create_thread(
                     name=thread_name,
                     auto_archive_duration=60 # Archive after 1 hour of inactivity
                 )
                 await thread.send(response_text)
-        except Exception as thread_err:
-            # Fallback to normal message with reference if thread creation fails (e.g. permission)
-            print(f"[Bot] Thread creation failed, falling back: {thread_err}")
-            await channel.send(response_text, reference=message)
+            except Exception as thread_err:
+                # Fallback to normal message with reference if thread creation fails (e.g. permission)
+                logger.warning("Thread creation failed, falling back: %s", thread_err)
+                await channel.send(response_text, reference=message, mention_author=False)
+        else:
+            # Short responses go out as a single reply, without the thread round-trips
+            await channel.send(response_text, reference=message, mention_author=False)
             
-        print(f"[Bot] Sent response for message {message.id}")
+        logger.info("Sent response for message %s", message.id)
 
 
 # Create bot instance
@@ -361,21 +682,28 @@ async def translate_command(ctx: commands.Context, *, text: str):
     Or: !translate 翻译为日语: <text>
     """
     async with ctx.typing():
-        # Get recent context from the channel
-        from database import get_recent_messages
-        recent_msgs = get_recent_messages(
-            channel_id=str(ctx.channel.id),
-            limit=5
-        )
-        
-        # Filter out the command message itself if present
-        context = [
-            msg for msg in recent_msgs 
-            if msg['msg_id'] != str(ctx.message.id)
-        ]
-        
-        # Perform translation
-        result = await translate_with_context(text, context)
+        # Reuse a recent translation of the same text in this channel if available
+        result = translator_cache.lookup(ctx.channel.id, text)
+        if result is None:
+            # Get recent context from the in-memory message cache first
+            context = bot._get_cached_channel_context(ctx.channel.id, ctx.message.id, limit=5)
+            
+            # Fall back to the database when the cache has too little history
+            if len(context) < 2:
+                recent_msgs = await aget_recent_messages(
+                    channel_id=ctx.channel.id,
+                    limit=5
+                )
+                
+                # Filter out the command message itself if present
+                context = [
+                    msg for msg in recent_msgs 
+                    if msg['msg_id'] != ctx.message.id
+                ]
+            
+            # Perform translation
+            result = await translate_with_context(text, context)
+            translator_cache.put(ctx.channel.id, text, None, result)
         
         if result.get("error"):
             await ctx.send(f"❌ Translation failed: {result['error']}")
@@ -390,58 +718,79 @@ async def translate_command(ctx: commands.Context, *, text: str):
         
         embed.add_field(
             name="💬 Original",
-            value=result["original"][:1024],
+            value=_truncate(result["original"]),
             inline=False
         )
         
-        if result["translation"]:
+        for _, section_title, section_text in _result_sections(result):
             embed.add_field(
-                name="📝 Translation",
-                value=result["translation"][:1024],
-                inline=False
-            )
-        
-        context_exp = result.get("context_explanation", "").strip()
-        if context_exp and context_exp.lower() not in ["none", "n/a", "-", "无"]:
-            embed.add_field(
-                name="📚 Context / Term Explanation",
-                value=context_exp[:1024],
-                inline=False
-            )
-        
-        tone_notes = result.get("tone_notes", "").strip()
-        if tone_notes and tone_notes.lower() not in ["none", "n/a", "-", "无"]:
-            embed.add_field(
-                name="🎭 Tone Notes",
-                value=tone_notes[:1024],
+                name=section_title,
+                value=_truncate(section_text),
                 inline=False
             )
         
         await ctx.send(embed=embed)
 
 
+def _setup_logging() -> logging.handlers.QueueListener:
+    """
+    Route all logging through a queue drained by a background thread.
+    
+    Handlers on the event loop only enqueue records; formatting and the
+    stream write happen on the listener thread. Library and module loggers
+    default to WARNING with the bot's own logger at INFO; everything is
+    DEBUG when BOT_DEBUG=1.
+    
+    Returns:
+        The started listener; stop it on shutdown to flush pending records
+    """
+    stream_handler = logging.StreamHandler()
+    stream_handler.setFormatter(
+        logging.Formatter("%(asctime)s [%(name)s] %(levelname)s: %(message)s")
+    )
+    log_queue: "queue.SimpleQueue[logging.LogRecord]" = queue.SimpleQueue()
+    listener = logging.handlers.QueueListener(log_queue, stream_handler)
+    
+    root = logging.getLogger()
+    root.setLevel(logging.DEBUG if BOT_DEBUG else logging.WARNING)
+    if not BOT_DEBUG:
+        logger.setLevel(logging.INFO)
+    root.addHandler(logging.handlers.QueueHandler(log_queue))
+    
+    listener.start()
+    return listener
+
+
 def main():
     """Main entry point for the bot."""
+    log_listener = _setup_logging()
+    
     if not DISCORD_TOKEN:
-        print("[Bot] Error: DISCORD_TOKEN environment variable is not set!")
-        print("[Bot] Please set the DISCORD_TOKEN in your .env file")
+        logger.error("DISCORD_TOKEN environment variable is not set!")
+        logger.error("Please set the DISCORD_TOKEN in your .env file")
+        log_listener.stop()
         exit(1)
     
-    print("[Bot] Starting AI Translator Bot...")
-    print(f"[Bot] Translation trigger: {TRANSLATION_EMOJI} reaction")
+    logger.info("Starting AI Translator Bot...")
+    logger.info("Translation trigger: %s reaction", TRANSLATION_EMOJI)
     
     try:
-        bot.run(DISCORD_TOKEN)
+        # Logging is configured above; don't let discord.py install its own handler
+        bot.run(DISCORD_TOKEN, log_handler=None)
     except discord.LoginFailure:
-        print("[Bot] Error: Invalid Discord token!")
+        logger.error("Invalid Discord token!")
         exit(1)
     except Exception as e:
-        print(f"[Bot] Fatal error: {e}")
+        logger.error("Fatal error: %s", e)
         exit(1)
     finally:
-        # Close database connection
+        # Let in-flight writes finish, persist queued messages, then close
+        # database connection
+        shutdown_writer()
+        bot.flush_write_queue()
         db.close()
-        print("[Bot] Database connection closed")
+        logger.info("Database connection closed")
+        log_listener.stop()
 
 
 if __name__ == "__main__":
@@ -9,12 +9,156 @@ Handles SQLite persistence for messages with support for:
 
 import sqlite3
 import json
-from datetime import datetime
-from typing import Optional, List, Dict, Any
+import asyncio
+import logging
+from datetime import datetime, timedelta, timezone
+from typing import Optional, List, Dict, Any, Tuple
 from contextlib import contextmanager
+from concurrent.futures import ThreadPoolExecutor
 import threading
 
 
+logger = logging.getLogger("database")
+
+
+# Column order of message rows passed to save_messages_bulk
+MESSAGE_FIELDS = (
+    "msg_id", "user_id", "user_name", "content",
+    "timestamp", "channel_id", "thread_id", "guild_id"
+)
+
+# One message row, typed per column of MESSAGE_FIELDS
+MessageRow = Tuple[int, int, str, str, int, int, Optional[int], Optional[int]]
+
+
+_EPOCH = datetime(1970, 1, 1, tzinfo=timezone.utc)
+_ONE_MICROSECOND = timedelta(microseconds=1)
+
+# Applied once to every new connection. page_size must precede the switch to
+# WAL to take effect on a new database file. WAL lets readers proceed during
+# writes and makes synchronous=NORMAL safe; temp_store keeps sort/temp
+# B-trees for context queries off disk; reads are served from a 256 MiB
+# memory map with up to 64 MiB of pages cached.
+_SQL_CONNECTION_PRAGMAS = """
+    PRAGMA page_size=8192;
+    PRAGMA journal_mode=WAL;
+    PRAGMA synchronous=NORMAL;
+    PRAGMA busy_timeout=5000;
+    PRAGMA temp_store=MEMORY;
+    PRAGMA mmap_size=268435456;
+    PRAGMA cache_size=-65536;
+"""
+
+# Maximum number of rows removed per transaction by delete_old_messages
+DELETE_BATCH_SIZE = 1000
+
+_SQL_CREATE_TABLE = """
+    CREATE TABLE IF NOT EXISTS messages (
+        msg_id INTEGER PRIMARY KEY,
+        user_id INTEGER NOT NULL,
+        user_name TEXT NOT NULL,
+        content TEXT NOT NULL,
+        timestamp INTEGER NOT NULL,
+        channel_id INTEGER NOT NULL,
+        thread_id INTEGER,
+        guild_id INTEGER,
+        created_at TEXT DEFAULT CURRENT_TIMESTAMP
+    )
+"""
+
+# Statements used on every call are kept as module constants so each call
+# passes the same string object to sqlite3's per-connection statement cache
+
+_SQL_INSERT = """
+    INSERT OR REPLACE INTO messages
+    (msg_id, user_id, user_name, content, timestamp, channel_id, thread_id, guild_id)
+    VALUES (?, ?, ?, ?, ?, ?, ?, ?)
+"""
+
+_SQL_GET_MESSAGE = "SELECT * FROM messages WHERE msg_id = ?"
+
+# One statement: the target row is looked up once in the CTE, then the thread
+# branch or the channel branch (messages outside threads, which have separate
+# context) returns rows, never both. Each branch takes the newest :limit rows
+# via its index; the outer ORDER BY puts them in chronological order.
+_SQL_GET_CONTEXT = """
+    WITH target AS (
+        SELECT channel_id, thread_id, timestamp FROM messages WHERE msg_id = :msg_id
+    )
+    SELECT * FROM (
+        SELECT * FROM messages
+        WHERE thread_id = (SELECT thread_id FROM target)
+        AND timestamp <= (SELECT timestamp FROM target)
+        AND msg_id != :msg_id
+        ORDER BY timestamp DESC
+        LIMIT :limit
+    )
+    UNION ALL
+    SELECT * FROM (
+        SELECT * FROM messages
+        WHERE channel_id = (SELECT channel_id FROM target)
+        AND thread_id IS NULL
+        AND (SELECT thread_id IS NULL FROM target)
+        AND timestamp <= (SELECT timestamp FROM target)
+        AND msg_id != :msg_id
+        ORDER BY timestamp DESC
+        LIMIT :limit
+    )
+    ORDER BY timestamp
+"""
+
+_SQL_GET_RECENT_THREAD = """
+    SELECT * FROM messages
+    WHERE thread_id = ?
+    ORDER BY timestamp DESC
+    LIMIT ?
+"""
+
+_SQL_GET_RECENT_CHANNEL = """
+    SELECT * FROM messages
+    WHERE channel_id = ? AND thread_id IS NULL
+    ORDER BY timestamp DESC
+    LIMIT ?
+"""
+
+# Expired rows are removed in LIMITed batches (stock SQLite has no DELETE ... LIMIT)
+_SQL_DELETE_OLD = """
+    DELETE FROM messages
+    WHERE rowid IN (
+        SELECT rowid FROM messages
+        WHERE timestamp < ?
+        LIMIT ?
+    )
+"""
+
+# SQL expressions converting columns of older schemas to the current types,
+# keyed by column name; the legacy column type is TEXT for all of them
+_LEGACY_COLUMN_CONVERSIONS = {
+    # ISO-8601 text -> microseconds since the Unix epoch (Discord timestamps
+    # have millisecond precision, which julianday() preserves after rounding)
+    "timestamp": "CAST(ROUND((julianday(timestamp) - 2440587.5) * 86400000) AS INTEGER) * 1000",
+    # Stringified Discord snowflakes -> integers
+    "msg_id": "CAST(msg_id AS INTEGER)",
+    "user_id": "CAST(user_id AS INTEGER)",
+    "channel_id": "CAST(channel_id AS INTEGER)",
+    "thread_id": "CAST(thread_id AS INTEGER)",
+    "guild_id": "CAST(guild_id AS INTEGER)",
+}
+
+
+def timestamp_us(dt: datetime) -> int:
+    """
+    Convert an aware datetime to the stored timestamp format.
+    
+    Args:
+        dt: Timezone-aware datetime
+        
+    Returns:
+        Microseconds since the Unix epoch
+    """
+    return (dt - _EPOCH) // _ONE_MICROSECOND
+
+
 class MessageDatabase:
     """
     SQLite database handler for Discord messages.
@@ -32,48 +176,108 @@ class MessageDatabase:
     def _connection(self) -> sqlite3.Connection:
         """Get thread-local database connection."""
         if not hasattr(self._local, 'connection') or self._local.connection is None:
-            self._local.connection = sqlite3.connect(self.db_path)
-            self._local.connection.row_factory = sqlite3.Row
+            # Autocommit mode: write transactions are opened explicitly by _transaction()
+            connection = sqlite3.connect(self.db_path, isolation_level=None)
+            connection.row_factory = sqlite3.Row
+            connection.executescript(_SQL_CONNECTION_PRAGMAS)
+            self._local.connection = connection
         return self._local.connection
     
+    @contextmanager
+    def _transaction(self):
+        """
+        Run a write transaction on the thread-local connection.
+        
+        BEGIN IMMEDIATE takes the write lock up front, so concurrent writers
+        wait on busy_timeout instead of failing with SQLITE_BUSY mid-transaction.
+        """
+        connection = self._connection
+        connection.execute("BEGIN IMMEDIATE")
+        try:
+            yield connection
+        except BaseException:
+            if connection.in_transaction:
+                connection.execute("ROLLBACK")
+            raise
+        else:
+            connection.execute("COMMIT")
+    
     def _init_database(self) -> None:
         """Initialize database schema."""
-        with self._connection:
-            self._connection.execute("""
-                CREATE TABLE IF NOT EXISTS messages (
-                    msg_id TEXT PRIMARY KEY,
-                    user_id TEXT NOT NULL,
-                    user_name TEXT NOT NULL,
-                    content TEXT NOT NULL,
-                    timestamp TEXT NOT NULL,
-                    channel_id TEXT NOT NULL,
-                    thread_id TEXT,
-                    guild_id TEXT,
-                    created_at TEXT DEFAULT CURRENT_TIMESTAMP
-                )
-            """)
+        self._migrate_legacy_schema()
+        
+        with self._transaction():
+            self._connection.execute(_SQL_CREATE_TABLE)
             
             # Index for efficient context queries
+            # Channel context only ever covers messages outside threads, so the
+            # channel index is partial; it supersedes idx_messages_channel_time
+            self._connection.execute("DROP INDEX IF EXISTS idx_messages_channel_time")
             self._connection.execute("""
-                CREATE INDEX IF NOT EXISTS idx_messages_channel_time 
+                CREATE INDEX IF NOT EXISTS idx_messages_channel_nothread_time
                 ON messages(channel_id, timestamp DESC)
+                WHERE thread_id IS NULL
             """)
             
             self._connection.execute("""
                 CREATE INDEX IF NOT EXISTS idx_messages_thread_time 
                 ON messages(thread_id, timestamp DESC)
             """)
+            
+            # Index for the expiry range scan in delete_old_messages
+            self._connection.execute("""
+                CREATE INDEX IF NOT EXISTS idx_messages_timestamp
+                ON messages(timestamp)
+            """)
+    
+    def _migrate_legacy_schema(self) -> None:
+        """
+        Rebuild the messages table if it was created with older column types.
+        
+        Existing rows are copied over, converting each legacy TEXT column
+        with _LEGACY_COLUMN_CONVERSIONS; rows whose timestamp cannot be
+        converted are dropped.
+        """
+        columns = {
+            row['name']: row['type'].upper()
+            for row in self._connection.execute("PRAGMA table_info(messages)")
+        }
+        legacy = {
+            name for name in _LEGACY_COLUMN_CONVERSIONS
+            if columns.get(name) == "TEXT"
+        }
+        if not legacy:
+            return
+        
+        logger.info("Migrating columns %s to the current schema...", sorted(legacy))
+        all_columns = MESSAGE_FIELDS + ("created_at",)
+        select_list = ", ".join(
+            f"{_LEGACY_COLUMN_CONVERSIONS[name] if name in legacy else name} AS {name}"
+            for name in all_columns
+        )
+        with self._transaction() as connection:
+            connection.execute("ALTER TABLE messages RENAME TO messages_legacy")
+            connection.execute(_SQL_CREATE_TABLE)
+            connection.execute(
+                f"""
+                INSERT INTO messages ({", ".join(all_columns)})
+                SELECT * FROM (SELECT {select_list} FROM messages_legacy)
+                WHERE timestamp IS NOT NULL
+                """
+            )
+            # Dropping the old table also drops its indexes; they are recreated afterwards
+            connection.execute("DROP TABLE messages_legacy")
     
     def save_message(
         self,
-        msg_id: str,
-        user_id: str,
+        msg_id: int,
+        user_id: int,
         user_name: str,
         content: str,
-        timestamp: str,
-        channel_id: str,
-        thread_id: Optional[str] = None,
-        guild_id: Optional[str] = None
+        timestamp: int,
+        channel_id: int,
+        thread_id: Optional[int] = None,
+        guild_id: Optional[int] = None
     ) -> bool:
         """
         Save a message to the database.
@@ -83,30 +287,42 @@ class MessageDatabase:
             user_id: Discord user ID
             user_name: Discord username
             content: Message content
-            timestamp: ISO format timestamp
+            timestamp: Unix timestamp in microseconds (see timestamp_us)
             channel_id: Discord channel ID
             thread_id: Discord thread ID (if in a thread)
             guild_id: Discord guild/server ID
             
+        Returns:
+            True if saved successfully, False otherwise
+            
+        Note:
+            Each call commits its own transaction. High-volume callers should
+            accumulate rows and use save_messages_bulk instead, as the bot's
+            write queue does.
+        """
+        return self.save_messages_bulk(
+            [(msg_id, user_id, user_name, content, timestamp, channel_id, thread_id, guild_id)]
+        )
+    
+    def save_messages_bulk(self, rows: List[MessageRow]) -> bool:
+        """
+        Save a batch of messages in a single transaction.
+        
+        Args:
+            rows: Tuples of column values in MESSAGE_FIELDS order
+            
         Returns:
             True if saved successfully, False otherwise
         """
         try:
-            with self._connection:
-                self._connection.execute(
-                    """
-                    INSERT OR REPLACE INTO messages 
-                    (msg_id, user_id, user_name, content, timestamp, channel_id, thread_id, guild_id)
-                    VALUES (?, ?, ?, ?, ?, ?, ?, ?)
-                    """,
-                    (msg_id, user_id, user_name, content, timestamp, channel_id, thread_id, guild_id)
-                )
+            with self._transaction():
+                self._connection.executemany(_SQL_INSERT, rows)
             return True
         except sqlite3.Error as e:
-            print(f"[Database] Error saving message {msg_id}: {e}")
+            logger.error("Error saving %d messages: %s", len(rows), e)
             return False
     
-    def get_message(self, msg_id: str) -> Optional[Dict[str, Any]]:
+    def get_message(self, msg_id: int) -> Optional[Dict[str, Any]]:
         """
         Retrieve a specific message by ID.
         
@@ -117,21 +333,18 @@ class MessageDatabase:
             Message dict or None if not found
         """
         try:
-            cursor = self._connection.execute(
-                "SELECT * FROM messages WHERE msg_id = ?",
-                (msg_id,)
-            )
+            cursor = self._connection.execute(_SQL_GET_MESSAGE, (msg_id,))
             row = cursor.fetchone()
             return dict(row) if row else None
         except sqlite3.Error as e:
-            print(f"[Database] Error retrieving message {msg_id}: {e}")
+            logger.error("Error retrieving message %s: %s", msg_id, e)
             return None
     
     def get_relevant_context(
         self,
-        msg_id: str,
+        msg_id: int,
         limit: int = 10
-    ) -> List[Dict[str, Any]]:
+    ) -> List[sqlite3.Row]:
         """
         Get recent messages in the same channel/thread for context.
         
@@ -143,68 +356,29 @@ class MessageDatabase:
             limit: Maximum number of context messages to retrieve
             
         Returns:
-            List of message dicts, ordered by timestamp (oldest first)
+            List of message rows (subscriptable by column name, e.g.
+            row['content']), ordered by timestamp (oldest first)
         """
         try:
-            # First, get the target message to determine channel/thread
-            target = self.get_message(msg_id)
-            if not target:
-                print(f"[Database] Target message {msg_id} not found")
-                return []
-            
-            channel_id = target['channel_id']
-            thread_id = target['thread_id']
-            target_time = target['timestamp']
-            
-            # Query for recent messages in the same context
-            # Prioritize thread context if available, otherwise channel
-            if thread_id:
-                # In a thread - get messages from the same thread
-                cursor = self._connection.execute(
-                    """
-                    SELECT * FROM messages 
-                    WHERE thread_id = ? 
-                    AND timestamp <= ?
-                    AND msg_id != ?
-                    ORDER BY timestamp DESC
-                    LIMIT ?
-                    """,
-                    (thread_id, target_time, msg_id, limit)
-                )
-            else:
-                # Not in a thread - get messages from the same channel
-                # Exclude messages that are in threads (they have separate context)
-                cursor = self._connection.execute(
-                    """
-                    SELECT * FROM messages 
-                    WHERE channel_id = ? 
-                    AND thread_id IS NULL
-                    AND timestamp <= ?
-                    AND msg_id != ?
-                    ORDER BY timestamp DESC
-                    LIMIT ?
-                    """,
-                    (channel_id, target_time, msg_id, limit)
-                )
-            
-            rows = cursor.fetchall()
-            
-            # Convert to dicts and reverse to get chronological order (oldest first)
-            messages = [dict(row) for row in reversed(rows)]
+            cursor = self._connection.execute(
+                _SQL_GET_CONTEXT,
+                {"msg_id": msg_id, "limit": limit}
+            )
+            messages = cursor.fetchall()
             
-            print(f"[Database] Retrieved {len(messages)} context messages for {msg_id}")
+            logger.debug("Retrieved %d context messages for %s", len(messages), msg_id)
             return messages
             
         except sqlite3.Error as e:
-            print(f"[Database] Error getting context for {msg_id}: {e}")
+            logger.error("Error getting context for %s: %s", msg_id, e)
             return []
     
     def get_recent_messages(
         self,
-        channel_id: Optional[str] = None,
-        thread_id: Optional[str] = None,
+        channel_id: Optional[int] = None,
+        thread_id: Optional[int] = None,
         limit: int = 20
-    ) -> List[Dict[str, Any]]:
+    ) -> List[sqlite3.Row]:
         """
         Get recent messages from a channel or thread.
         
@@ -214,63 +388,59 @@ class MessageDatabase:
             limit: Maximum number of messages
             
         Returns:
-            List of message dicts, ordered by timestamp (newest first)
+            List of message rows (subscriptable by column name, e.g.
+            row['content']), ordered by timestamp (newest first)
         """
         try:
             if thread_id:
-                cursor = self._connection.execute(
-                    """
-                    SELECT * FROM messages 
-                    WHERE thread_id = ? 
-                    ORDER BY timestamp DESC
-                    LIMIT ?
-                    """,
-                    (thread_id, limit)
-                )
+                cursor = self._connection.execute(_SQL_GET_RECENT_THREAD, (thread_id, limit))
             elif channel_id:
-                cursor = self._connection.execute(
-                    """
-                    SELECT * FROM messages 
-                    WHERE channel_id = ? AND thread_id IS NULL
-                    ORDER BY timestamp DESC
-                    LIMIT ?
-                    """,
-                    (channel_id, limit)
-                )
+                cursor = self._connection.execute(_SQL_GET_RECENT_CHANNEL, (channel_id, limit))
             else:
                 return []
             
-            rows = cursor.fetchall()
-            return [dict(row) for row in rows]
+            return cursor.fetchall()
             
         except sqlite3.Error as e:
-            print(f"[Database] Error retrieving recent messages: {e}")
+            logger.error("Error retrieving recent messages: %s", e)
             return []
     
-    def delete_old_messages(self, days: int = 30) -> int:
+    def delete_old_messages(self, days: int = 30, batch_size: int = DELETE_BATCH_SIZE) -> int:
         """
         Delete messages older than specified days.
         
+        Rows are deleted in batches of batch_size, each in its own short
+        transaction, so writers are never blocked for long.
+        
         Args:
             days: Number of days to keep
+            batch_size: Maximum number of rows deleted per transaction
             
         Returns:
             Number of deleted messages
         """
+        cutoff = timestamp_us(datetime.now(timezone.utc) - timedelta(days=days))
+        deleted = 0
+        try:
+            while True:
+                with self._transaction():
+                    cursor = self._connection.execute(_SQL_DELETE_OLD, (cutoff, batch_size))
+                deleted += cursor.rowcount
+                if cursor.rowcount < batch_size:
+                    break
+        except sqlite3.Error as e:
+            logger.error("Error deleting old messages: %s", e)
+        
+        logger.info("Deleted %d old messages", deleted)
+        return deleted
+    
+    def vacuum(self) -> None:
+        """Rebuild the database file to reclaim space freed by deletes."""
         try:
-            with self._connection:
-                cursor = self._connection.execute(
-                    """
-                    DELETE FROM messages 
-                    WHERE timestamp < datetime('now', '-{} days')
-                    """.format(days)
-                )
-                deleted = cursor.rowcount
-                print(f"[Database] Deleted {deleted} old messages")
-                return deleted
+            self._connection.execute("VACUUM")
+            logger.info("Vacuum completed")
         except sqlite3.Error as e:
-            print(f"[Database] Error deleting old messages: {e}")
-            return 0
+            logger.error("Error during vacuum: %s", e)
     
     def close(self) -> None:
         """Close the database connection."""
@@ -291,24 +461,86 @@ db = MessageDatabase()
 
 # Convenience functions for direct use
 def save_message(
-    msg_id: str,
-    user_id: str,
+    msg_id: int,
+    user_id: int,
     user_name: str,
     content: str,
-    timestamp: str,
-    channel_id: str,
-    thread_id: Optional[str] = None,
-    guild_id: Optional[str] = None
+    timestamp: int,
+    channel_id: int,
+    thread_id: Optional[int] = None,
+    guild_id: Optional[int] = None
 ) -> bool:
     """Save a message using the default database instance."""
     return db.save_message(msg_id, user_id, user_name, content, timestamp, channel_id, thread_id, guild_id)
 
 
-def get_relevant_context(msg_id: str, limit: int = 10) -> List[Dict[str, Any]]:
+def save_messages_bulk(rows: List[MessageRow]) -> bool:
+    """Save a batch of messages using the default database instance."""
+    return db.save_messages_bulk(rows)
+
+
+def get_relevant_context(msg_id: int, limit: int = 10) -> List[sqlite3.Row]:
     """Get relevant context using the default database instance."""
     return db.get_relevant_context(msg_id, limit)
 
 
-def get_message(msg_id: str) -> Optional[Dict[str, Any]]:
+def get_recent_messages(
+    channel_id: Optional[int] = None,
+    thread_id: Optional[int] = None,
+    limit: int = 20
+) -> List[sqlite3.Row]:
+    """Get recent messages using the default database instance."""
+    return db.get_recent_messages(channel_id, thread_id, limit)
+
+
+def get_message(msg_id: int) -> Optional[Dict[str, Any]]:
     """Get a message by ID using the default database instance."""
     return db.get_message(msg_id)
+
+
+# Async variants for use from the event loop. Reads run on the default
+# executor and proceed concurrently under WAL; writes and maintenance all go
+# through one dedicated thread, so they never contend for the write lock.
+_WRITE_POOL = ThreadPoolExecutor(max_workers=1, thread_name_prefix="db-writer")
+
+
+async def asave_messages_bulk(rows: List[MessageRow]) -> bool:
+    """Save a batch of messages on the database writer thread."""
+    loop = asyncio.get_running_loop()
+    return await loop.run_in_executor(_WRITE_POOL, db.save_messages_bulk, rows)
+
+
+async def adelete_old_messages(days: int = 30) -> int:
+    """Delete expired messages on the database writer thread."""
+    loop = asyncio.get_running_loop()
+    return await loop.run_in_executor(_WRITE_POOL, db.delete_old_messages, days)
+
+
+async def avacuum() -> None:
+    """Vacuum the database on the database writer thread."""
+    loop = asyncio.get_running_loop()
+    await loop.run_in_executor(_WRITE_POOL, db.vacuum)
+
+
+def shutdown_writer() -> None:
+    """Wait for queued and running writes on the database writer thread to finish."""
+    _WRITE_POOL.shutdown(wait=True)
+
+
+async def aget_relevant_context(msg_id: int, limit: int = 10) -> List[sqlite3.Row]:
+    """Get relevant context without blocking the event loop."""
+    return await asyncio.to_thread(db.get_relevant_context, msg_id, limit)
+
+
+async def aget_recent_messages(
+    channel_id: Optional[int] = None,
+    thread_id: Optional[int] = None,
+    limit: int = 20
+) -> List[sqlite3.Row]:
+    """Get recent messages without blocking the event loop."""
+    return await asyncio.to_thread(db.get_recent_messages, channel_id, thread_id, limit)
+
+
+async def aget_message(msg_id: int) -> Optional[Dict[str, Any]]:
+    """Get a message by ID without blocking the event loop."""
+    return await asyncio.to_thread(db.get_message, msg_id)
@@ -1,6 +1,7 @@
 import asyncio
+import logging
 import os
-from translator import translate_with_context
+from translator import translate_with_context, close_session
 
 async def test_translation(text, context=[]):
     print(f"\n--- Testing Input ---")
@@ -26,6 +27,12 @@ async def main():
     
     # Test case 3: Ambiguous context
     await test_translation("これ、いくらですか？")
+    
+    await close_session()
 
 if __name__ == "__main__":
+    logging.basicConfig(
+        level=logging.DEBUG,
+        format="%(asctime)s [%(name)s] %(levelname)s: %(message)s",
+    )
     asyncio.run(main())
@@ -9,9 +9,20 @@ Handles AI-powered translation using MiMo-V2-Flash API with:
 
 import os
 import re
-import json
-from typing import List, Dict, Any, Optional, Tuple
+import asyncio
+import hashlib
+import logging
+import sqlite3
+from collections import OrderedDict
+from typing import List, Dict, Any, Mapping, Optional, Sequence, Tuple, Union
 import httpx
+import orjson
+
+
+logger = logging.getLogger("translator")
+
+# A context message: a database row, or a dict with the same fields
+ContextMessage = Union[sqlite3.Row, Mapping[str, Any]]
 
 
 # Configuration from environment variables
@@ -21,17 +32,68 @@ MIMO_BASE_URL = os.getenv("MIMO_BASE_URL", "https://api.xiaomimimo.com/v1")
 # Default model
 DEFAULT_MODEL = os.getenv("MIMO_MODEL", "xiaomi/mimo-v2-flash")
 
-# Language instruction patterns
-LANGUAGE_PATTERNS = [
-    # Chinese patterns
-    (r"^翻译为?(\w+)", "auto"),
-    (r"^翻译成?(\w+)", "auto"),
-    (r"^译为?(\w+)", "auto"),
-    (r"^译成?(\w+)", "auto"),
-    # English patterns
-    (r"^translate to (\w+)", "auto"),
-    (r"^translate into (\w+)", "auto"),
-]
+# HTTP client settings; connections are kept alive and reused between calls,
+# and HTTP/2 lets concurrent requests share one connection
+HTTP_TIMEOUT = 60.0
+HTTP_LIMITS = httpx.Limits(
+    max_connections=32,
+    max_keepalive_connections=32,
+    keepalive_expiry=60.0
+)
+
+# Retries: failed connection attempts are retried by the transport; requests
+# failing with a transport error or a 429/5xx status are resent up to
+# API_MAX_ATTEMPTS times in total, with exponential backoff between attempts
+HTTP_CONNECT_RETRIES = 3
+API_MAX_ATTEMPTS = 3
+API_BACKOFF_BASE = 0.5  # seconds, doubled after each failed attempt
+API_BACKOFF_MAX = 4.0
+
+# Shared client, created on first use by _get_client()
+_client: Optional[httpx.AsyncClient] = None
+
+# Context is only filtered by the AI when it has more than FILTER_MIN_MESSAGES
+# messages and at least FILTER_MIN_CHARS characters of content
+FILTER_MIN_MESSAGES = 5
+FILTER_MIN_CHARS = 2000
+
+# Context filter results, keyed by (target content digest, context msg_ids) and
+# stored as the selected positions in that context list; oldest evicted first
+FILTER_CACHE_MAXSIZE = 512
+_filter_cache: "OrderedDict[Tuple[bytes, Tuple[Any, ...]], Tuple[int, ...]]" = OrderedDict()
+
+# Language instruction prefix, e.g. "翻译为日语", "译成英文", "translate into French";
+# group 1 is the language name
+_LANG_INSTRUCTION_RE = re.compile(
+    r"^(?:(?:翻译|译)[为成]?|translate\s+(?:in)?to\s+)(\w+)",
+    re.IGNORECASE
+)
+
+# Every character _LANG_INSTRUCTION_RE can match first
+_INSTRUCTION_FIRST_CHARS = frozenset("翻译tT")
+
+# Leading ":" / "：" delimiter (and following whitespace) after an instruction or section marker
+_LEADING_DELIM = re.compile(r"^[：:]\s*")
+
+# Section markers in model responses, most preferred first; when a response
+# contains several markers for one section, the highest-ranked one wins.
+# [Response] is used instead of [Translation] when the message is a task.
+_SECTION_MARKERS = {
+    "translation": ["[Translation]", "【Translation】", "[Response]", "【Response】", "Translation:"],
+    "context_explanation": ["[Context/Term Explanation]", "【Context/Term Explanation】", "Context/Term Explanation:", "[Context]", "【Context】"],
+    "tone_notes": ["[Tone Notes]", "【Tone Notes】", "Tone Notes:", "[Tone]", "【Tone】"]
+}
+# Marker text -> (section name, rank within that section)
+_SECTION_MARKER_RANK = {
+    marker: (name, rank)
+    for name, markers in _SECTION_MARKERS.items()
+    for rank, marker in enumerate(markers)
+}
+_SECTION_RE = re.compile(
+    r"\[(Translation|Response|Context(?:/Term Explanation)?|Tone(?: Notes)?)\]"
+    r"|【(Translation|Response|Context(?:/Term Explanation)?|Tone(?: Notes)?)】"
+    r"|(Translation|Context/Term Explanation|Tone Notes):"
+)
 
 # Language name mappings
 LANGUAGE_MAP = {
@@ -76,11 +138,39 @@ LANGUAGE_MAP = {
 }
 
 
+# Language names used in translation prompts, keyed by language code
+_LANG_CODE_TO_NAME = {
+    "zh": "Chinese (Simplified)",
+    "zh-tw": "Chinese (Traditional)",
+    "en": "English",
+    "ja": "Japanese",
+    "ko": "Korean",
+    "fr": "French",
+    "de": "German",
+    "es": "Spanish",
+    "ru": "Russian",
+    "it": "Italian",
+    "pt": "Portuguese",
+    "ar": "Arabic",
+}
+
+# Language code -> the first LANGUAGE_MAP name for it (the Chinese name), used
+# to phrase a "翻译为<name>" instruction that detect_language_instruction maps back
+_LANG_CODE_TO_INSTRUCTION_NAME: Dict[str, str] = {}
+for _name, _code in LANGUAGE_MAP.items():
+    _LANG_CODE_TO_INSTRUCTION_NAME.setdefault(_code, _name)
+
+
 class TranslationError(Exception):
     """Custom exception for translation errors."""
     pass
 
 
+class _RetryableStatusError(TranslationError):
+    """The API answered with a status worth retrying (429 or 5xx)."""
+    pass
+
+
 def detect_language_instruction(content: str) -> Tuple[str, Optional[str]]:
     """
     Detect if the message starts with a language instruction.
@@ -94,33 +184,36 @@ def detect_language_instruction(content: str) -> Tuple[str, Optional[str]]:
     """
     content = content.strip()
     
-    for pattern, _ in LANGUAGE_PATTERNS:
-        match = re.match(pattern, content, re.IGNORECASE)
-        if match:
-            lang_name = match.group(1).strip().lower()
-            # Try to map language name to code
-            target_lang = None
-            for name, code in LANGUAGE_MAP.items():
-                if name in lang_name:
-                    target_lang = code
-                    break
-            
-            if not target_lang:
-                target_lang = LANGUAGE_MAP.get(lang_name)
-            
-            # Remove the instruction from content
-            cleaned_content = content[match.end():].strip()
-            # Also remove common delimiters like : or ：
-            cleaned_content = re.sub(r"^[：:]\s*", "", cleaned_content)
-            
-            return cleaned_content, target_lang
+    # Most messages carry no instruction; skip the regex unless the first
+    # character could start one
+    if content[:1] not in _INSTRUCTION_FIRST_CHARS:
+        return content, None
+    
+    match = _LANG_INSTRUCTION_RE.match(content)
+    if not match:
+        return content, None
+    
+    lang_name = match.group(1).strip().lower()
+    # Map language name to code: exact name first, so "繁体中文" is not
+    # matched by its "中文" substring, then any known name it contains
+    target_lang = LANGUAGE_MAP.get(lang_name)
+    if not target_lang:
+        for name, code in LANGUAGE_MAP.items():
+            if name in lang_name:
+                target_lang = code
+                break
+    
+    # Remove the instruction from content
+    cleaned_content = content[match.end():].strip()
+    # Also remove common delimiters like : or ：
+    cleaned_content = _LEADING_DELIM.sub("", cleaned_content)
     
-    return content, None
+    return cleaned_content, target_lang
 
 
 def build_context_filter_prompt(
     target_content: str,
-    context_list: List[Dict[str, Any]]
+    context_list: Sequence[ContextMessage]
 ) -> str:
     """
     Build the prompt for AI-based context filtering.
@@ -132,10 +225,10 @@ def build_context_filter_prompt(
     Returns:
         The prompt string for the AI
     """
-    context_text = "\n".join([
-        f"[{i+1}] {ctx['user_name']}: {ctx['content']}"
-        for i, ctx in enumerate(context_list)
-    ])
+    context_text = "\n".join(
+        f"[{i}] {ctx['user_name']}: {ctx['content']}"
+        for i, ctx in enumerate(context_list, 1)
+    )
     
     prompt = f"""You are a context filtering assistant for a translation system.
 
@@ -164,7 +257,7 @@ Your response:"""
 
 def build_translation_prompt(
     message_content: str,
-    filtered_context: List[Dict[str, Any]],
+    filtered_context: Sequence[ContextMessage],
     target_language: Optional[str] = None
 ) -> str:
     """
@@ -180,10 +273,10 @@ def build_translation_prompt(
     """
     # Build context section
     if filtered_context:
-        context_text = "\n".join([
+        context_text = "\n".join(
             f"- {ctx['user_name']}: {ctx['content']}"
             for ctx in filtered_context
-        ])
+        )
         context_section = f"""
 Relevant conversation context:
 {context_text}
@@ -199,21 +292,7 @@ Relevant conversation context:
         message_content = cleaned_content
     
     if target_language:
-        lang_names = {
-            "zh": "Chinese (Simplified)",
-            "zh-tw": "Chinese (Traditional)",
-            "en": "English",
-            "ja": "Japanese",
-            "ko": "Korean",
-            "fr": "French",
-            "de": "German",
-            "es": "Spanish",
-            "ru": "Russian",
-            "it": "Italian",
-            "pt": "Portuguese",
-            "ar": "Arabic",
-        }
-        lang_name = lang_names.get(target_language, target_language)
+        lang_name = _LANG_CODE_TO_NAME.get(target_language, target_language)
         lang_instruction = f"IMPORTANT: You MUST follow the user's instruction to translate or perform a specific writing task in {lang_name}."
     else:
         lang_instruction = "Detect the source language and translate into English (or keep as English if already in English)."
@@ -236,6 +315,109 @@ ONLY provide [Context/Term Explanation] or [Tone Notes] if there is a critical c
     return prompt
 
 
+def _get_client() -> httpx.AsyncClient:
+    """
+    Return the shared HTTP client, creating it on first use.
+    
+    Must be called from inside the running event loop.
+    """
+    global _client
+    if _client is None or _client.is_closed:
+        # The transport retries failed connection attempts; it never resends a request
+        transport = httpx.AsyncHTTPTransport(
+            http2=True,
+            limits=HTTP_LIMITS,
+            retries=HTTP_CONNECT_RETRIES
+        )
+        _client = httpx.AsyncClient(timeout=HTTP_TIMEOUT, transport=transport)
+    return _client
+
+
+async def init_session() -> None:
+    """Create the shared HTTP client ahead of the first API call."""
+    _get_client()
+
+
+async def close_session() -> None:
+    """Close the shared HTTP client, if one was created."""
+    global _client
+    if _client is not None:
+        client, _client = _client, None
+        await client.aclose()
+
+
+async def _read_event_stream(response: httpx.Response) -> str:
+    """
+    Collect the generated text from a streamed (server-sent events) completion.
+    
+    Args:
+        response: The open streaming response
+        
+    Returns:
+        The concatenated content deltas
+        
+    Raises:
+        TranslationError: If the stream carried no choices
+    """
+    parts = []
+    has_choices = False
+    async for line in response.aiter_lines():
+        if not line.startswith("data:"):
+            continue  # Blank separators, comments and other SSE fields
+        data = line[5:].strip()
+        if data == "[DONE]":
+            break
+        
+        choices = orjson.loads(data).get("choices")
+        if not choices:
+            continue
+        has_choices = True
+        content = (choices[0].get("delta") or {}).get("content")
+        if content:
+            parts.append(content)
+    
+    if not has_choices:
+        raise TranslationError("Invalid API response: no choices found")
+    
+    return "".join(parts)
+
+
+async def _request_completion(headers: Dict[str, str], body: bytes) -> str:
+    """
+    Send one chat completion request and return the generated text.
+    
+    Raises:
+        _RetryableStatusError: On a 429 or 5xx response
+        TranslationError: On any other non-200 response or an empty answer
+    """
+    async with _get_client().stream(
+        "POST",
+        f"{MIMO_BASE_URL}/chat/completions",
+        headers=headers,
+        content=body
+    ) as response:
+        if response.status_code != 200:
+            await response.aread()
+            error = _RetryableStatusError if (
+                response.status_code == 429 or response.status_code >= 500
+            ) else TranslationError
+            raise error(
+                f"API returned status {response.status_code}: {response.text}"
+            )
+        
+        if response.headers.get("content-type", "").startswith("text/event-stream"):
+            return await _read_event_stream(response)
+        
+        # Endpoint ignored "stream": parse the complete JSON body
+        data = orjson.loads(await response.aread())
+    
+    if "choices" not in data or not data["choices"]:
+        raise TranslationError("Invalid API response: no choices found")
+    
+    content: str = data["choices"][0]["message"]["content"]
+    return content
+
+
 async def call_mimo_api(
     prompt: str,
     model: str = DEFAULT_MODEL,
@@ -271,41 +453,38 @@ async def call_mimo_api(
             {"role": "user", "content": prompt}
         ],
         "temperature": temperature,
-        "max_tokens": max_tokens
+        "max_tokens": max_tokens,
+        "stream": True
     }
+    body = orjson.dumps(payload)
+    # Same key on every attempt, so the server can recognise a resent request
+    headers["Idempotency-Key"] = hashlib.sha1(body).hexdigest()
     
+    attempt = 1
     try:
-        async with httpx.AsyncClient(timeout=60.0) as client:
-            response = await client.post(
-                f"{MIMO_BASE_URL}/chat/completions",
-                headers=headers,
-                json=payload
-            )
-            
-            if response.status_code != 200:
-                raise TranslationError(
-                    f"API returned status {response.status_code}: {response.text}"
-                )
-            
-            data = response.json()
-            
-            if "choices" not in data or not data["choices"]:
-                raise TranslationError("Invalid API response: no choices found")
-            
-            return data["choices"][0]["message"]["content"]
-            
+        while True:
+            try:
+                return await _request_completion(headers, body)
+            except (httpx.TransportError, _RetryableStatusError) as e:
+                if attempt >= API_MAX_ATTEMPTS:
+                    raise
+                delay = min(API_BACKOFF_BASE * 2 ** (attempt - 1), API_BACKOFF_MAX)
+                logger.warning("API attempt %d failed (%r), retrying in %.1fs", attempt, e, delay)
+                await asyncio.sleep(delay)
+                attempt += 1
+        
     except httpx.TimeoutException:
         raise TranslationError("API request timed out")
     except httpx.RequestError as e:
         raise TranslationError(f"API request failed: {e}")
-    except json.JSONDecodeError:
+    except orjson.JSONDecodeError:
         raise TranslationError("Invalid JSON response from API")
 
 
 async def filter_context_with_ai(
     target_content: str,
-    context_list: List[Dict[str, Any]]
-) -> List[Dict[str, Any]]:
+    context_list: Sequence[ContextMessage]
+) -> Sequence[ContextMessage]:
     """
     Use AI to filter context messages for semantic relevance.
     
@@ -319,10 +498,23 @@ async def filter_context_with_ai(
     if not context_list:
         return []
     
-    # If there's only one or two messages, return all of them
-    if len(context_list) <= 2:
+    # Small contexts go to the translation prompt unfiltered: a second LLM
+    # round-trip costs more latency than the extra prompt tokens
+    if (
+        len(context_list) <= FILTER_MIN_MESSAGES
+        or sum(len(ctx['content']) for ctx in context_list) < FILTER_MIN_CHARS
+    ):
         return context_list
     
+    cache_key = (
+        hashlib.blake2b(target_content.encode(), digest_size=16).digest(),
+        tuple(ctx['msg_id'] for ctx in context_list)
+    )
+    cached = _filter_cache.get(cache_key)
+    if cached is not None:
+        _filter_cache.move_to_end(cache_key)
+        return [context_list[i] for i in cached]
+    
     try:
         prompt = build_context_filter_prompt(target_content, context_list)
         response = await call_mimo_api(
@@ -331,46 +523,56 @@ async def filter_context_with_ai(
             max_tokens=500
         )
         
-        # Parse the JSON response
-        # Clean up the response to extract just the JSON array
+        # Parse the JSON response; usually it is already a bare JSON array
         response = response.strip()
-        
-        # Remove markdown code blocks if present
-        if response.startswith("```"):
-            response = re.sub(r"^```(?:json)?\s*", "", response)
-            response = re.sub(r"\s*```$", "", response)
-        
-        # Try to find a JSON array in the response
-        match = re.search(r"\[[\d,\s]*\]", response)
-        if match:
-            response = match.group(0)
-        
-        relevant_indices = json.loads(response)
+        try:
+            relevant_indices = orjson.loads(response)
+        except orjson.JSONDecodeError:
+            # Clean up the response to extract just the JSON array
+            # Remove markdown code blocks if present
+            if response.startswith("```"):
+                response = re.sub(r"^```(?:json)?\s*", "", response)
+                response = re.sub(r"\s*```$", "", response)
+            
+            # Try to find a JSON array in the response
+            match = re.search(r"\[[\d,\s]*\]", response)
+            if match:
+                response = match.group(0)
+            
+            relevant_indices = orjson.loads(response)
         
         if not isinstance(relevant_indices, list):
-            print(f"[Translator] Invalid response format, expected list: {response}")
+            logger.warning("Invalid response format, expected list: %s", response)
             return context_list
         
-        # Convert 1-based indices to 0-based and filter
-        filtered = []
-        for idx in relevant_indices:
-            if isinstance(idx, int) and 1 <= idx <= len(context_list):
-                filtered.append(context_list[idx - 1])
+        # Convert 1-based indices to 0-based, dropping repeats and keeping
+        # the messages in their original (chronological) order
+        count = len(context_list)
+        selected = tuple(sorted({
+            idx - 1 for idx in relevant_indices
+            if isinstance(idx, int) and 1 <= idx <= count
+        }))
+        logger.debug("Filtered %d messages to %d relevant", len(context_list), len(selected))
+        if not selected:
+            selected = tuple(range(len(context_list)))
         
-        print(f"[Translator] Filtered {len(context_list)} messages to {len(filtered)} relevant")
-        return filtered if filtered else context_list
+        _filter_cache[cache_key] = selected
+        if len(_filter_cache) > FILTER_CACHE_MAXSIZE:
+            _filter_cache.popitem(last=False)
         
-    except json.JSONDecodeError as e:
-        print(f"[Translator] Failed to parse context filter response: {e}")
+        return [context_list[i] for i in selected]
+        
+    except orjson.JSONDecodeError as e:
+        logger.warning("Failed to parse context filter response: %s", e)
         return context_list
     except Exception as e:
-        print(f"[Translator] Context filtering failed: {e}")
+        logger.warning("Context filtering failed: %s", e)
         return context_list
 
 
 async def translate_with_context(
     message_content: str,
-    context_list: List[Dict[str, Any]],
+    context_list: Sequence[ContextMessage],
     target_lang: Optional[str] = None
 ) -> Dict[str, Any]:
     """
@@ -394,41 +596,47 @@ async def translate_with_context(
         - translation: The translated text
         - context_explanation: Explanation of terms/context
         - tone_notes: Analysis of tone and register
+        - kind: "task" for a direct request (e.g. writing an email), otherwise "translation"
         - relevant_context: The filtered context messages used
         - error: Error message if translation failed
     """
-    result = {
+    result: Dict[str, Any] = {
         "original": message_content,
         "cleaned": message_content,
         "target_language": target_lang,
         "translation": "",
         "context_explanation": "",
         "tone_notes": "",
+        "kind": "translation",
         "relevant_context": [],
         "error": None
     }
     
     try:
-        # Step 1: Filter context using AI
-        print(f"[Translator] Filtering {len(context_list)} context messages...")
-        filtered_context = await filter_context_with_ai(message_content, context_list)
-        result["relevant_context"] = filtered_context
-        
-        # Step 2: Detect language instruction (only if target_lang not explicitly provided)
+        # Steps 1-2: Filter context using AI and, unless target_lang is given,
+        # detect a language instruction on a worker thread while the filter
+        # request is in flight. Cancelling the caller cancels both, and an
+        # error in either propagates.
+        logger.debug("Filtering %d context messages...", len(context_list))
         if not target_lang:
-            cleaned_content, detected_lang = detect_language_instruction(message_content)
+            filtered_context, (cleaned_content, detected_lang) = await asyncio.gather(
+                filter_context_with_ai(message_content, context_list),
+                asyncio.to_thread(detect_language_instruction, message_content)
+            )
             result["cleaned"] = cleaned_content
             result["target_language"] = detected_lang
             target_lang_to_use = detected_lang
             message_to_translate = cleaned_content
         else:
+            filtered_context = await filter_context_with_ai(message_content, context_list)
             target_lang_to_use = target_lang
             message_to_translate = message_content
             result["cleaned"] = message_content
+        result["relevant_context"] = filtered_context
         
         # Step 3: Build and send translation prompt
         prompt = build_translation_prompt(message_to_translate, filtered_context, target_lang_to_use)
-        print(f"[Translator] Sending translation request to {target_lang_to_use or 'Auto'}...")
+        logger.debug("Sending translation request to %s...", target_lang_to_use or "Auto")
         
         response = await call_mimo_api(prompt, temperature=0.3, max_tokens=2000)
         
@@ -437,14 +645,15 @@ async def translate_with_context(
         result["translation"] = parsed.get("translation", "")
         result["context_explanation"] = parsed.get("context_explanation", "")
         result["tone_notes"] = parsed.get("tone_notes", "")
+        result["kind"] = parsed["kind"]
         
-        print(f"[Translator] Translation completed successfully")
+        logger.debug("Translation completed successfully")
         
     except TranslationError as e:
-        print(f"[Translator] Translation error: {e}")
+        logger.error("Translation error: %s", e)
         result["error"] = str(e)
     except Exception as e:
-        print(f"[Translator] Unexpected error: {e}")
+        logger.exception("Unexpected error: %s", e)
         result["error"] = f"Unexpected error: {e}"
     
     return result
@@ -458,36 +667,35 @@ def parse_translation_response(response: str) -> Dict[str, str]:
         response: The raw API response
         
     Returns:
-        Dictionary with translation, context_explanation, and tone_notes
+        Dictionary with translation, context_explanation, tone_notes and
+        kind ("task" if the model answered under a [Response] header,
+        otherwise "translation")
     """
     result = {
         "translation": "",
         "context_explanation": "",
-        "tone_notes": ""
-    }
-    
-    # Define section markers
-    sections = {
-        "translation": ["[Translation]", "【Translation】", "Translation:"],
-        "context_explanation": ["[Context/Term Explanation]", "【Context/Term Explanation】", "Context/Term Explanation:", "[Context]", "【Context】"],
-        "tone_notes": ["[Tone Notes]", "【Tone Notes】", "Tone Notes:", "[Tone]", "【Tone】"]
+        "tone_notes": "",
+        "kind": "translation"
     }
     
-    # Find all section positions
-    section_positions = []
-    for section_name, markers in sections.items():
-        for marker in markers:
-            pos = response.find(marker)
-            if pos != -1:
-                section_positions.append((pos, section_name, len(marker)))
-                break
-    
-    # Sort by position
-    section_positions.sort(key=lambda x: x[0])
+    # Walk the markers in one pass, keeping for each section the first
+    # occurrence of its highest-ranked marker
+    best: Dict[str, Tuple[int, int, int, str]] = {}
+    for match in _SECTION_RE.finditer(response):
+        marker = match.group(0)
+        name, rank = _SECTION_MARKER_RANK[marker]
+        current = best.get(name)
+        if current is None or rank < current[0]:
+            best[name] = (rank, match.start(), match.end(), marker)
+    
+    section_positions = sorted(
+        (pos, end, name) for name, (_, pos, end, _) in best.items()
+    )
+    if "translation" in best and "Response" in best["translation"][3]:
+        result["kind"] = "task"
     
     # Extract content between sections
-    for i, (pos, name, marker_len) in enumerate(section_positions):
-        start = pos + marker_len
+    for i, (_, start, name) in enumerate(section_positions):
         if i + 1 < len(section_positions):
             end = section_positions[i + 1][0]
         else:
@@ -495,7 +703,7 @@ def parse_translation_response(response: str) -> Dict[str, str]:
         
         content = response[start:end].strip()
         # Remove leading colon or whitespace
-        content = re.sub(r"^[：:]\s*", "", content)
+        content = _LEADING_DELIM.sub("", content)
         result[name] = content
     
     # If no sections were found, treat entire response as translation
@@ -508,7 +716,7 @@ def parse_translation_response(response: str) -> Dict[str, str]:
 # Convenience function for direct use
 async def translate(
     content: str,
-    context: Optional[List[Dict[str, Any]]] = None,
+    context: Optional[Sequence[ContextMessage]] = None,
     target_lang: Optional[str] = None
 ) -> Dict[str, Any]:
     """
@@ -527,8 +735,7 @@ async def translate(
     # If target_lang is provided, prepend it to content temporarily
     # so detect_language_instruction can pick it up
     if target_lang:
-        lang_names_reverse = {v: k for k, v in LANGUAGE_MAP.items()}
-        lang_name = lang_names_reverse.get(target_lang, target_lang)
+        lang_name = _LANG_CODE_TO_INSTRUCTION_NAME.get(target_lang, target_lang)
         content = f"翻译为{lang_name}：{content}"
     
     return await translate_with_context(content, context)
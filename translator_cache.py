@@ -0,0 +1,77 @@
+"""
+Discord AI Translator - Translation Cache Module
+
+Short-lived cache in front of translate_with_context so repeated
+translation requests for the same text skip the LLM round-trip:
+- Keys are the channel, the whitespace-normalized message text and the
+  target language; context explanations and tone notes are written from
+  the channel's conversation, so results are never shared across channels
+- Entries expire after CACHE_TTL seconds, least recently used evicted first
+- Only successful translation results are stored
+- Lookups are a single hash probe; there is no per-entry similarity scan
+"""
+
+from typing import Optional, Dict, Any, Tuple
+
+from cachetools import TTLCache
+
+
+CACHE_MAXSIZE = 512
+CACHE_TTL = 300  # 5 minutes
+
+_cache: TTLCache = TTLCache(maxsize=CACHE_MAXSIZE, ttl=CACHE_TTL)
+
+
+def _make_key(
+    channel_id: int,
+    text: str,
+    target_lang: Optional[str]
+) -> Tuple[int, str, Optional[str]]:
+    """Build the cache key, ignoring differences in whitespace only."""
+    return channel_id, " ".join(text.split()), target_lang
+
+
+def lookup(
+    channel_id: int,
+    text: str,
+    target_lang: Optional[str] = None
+) -> Optional[Dict[str, Any]]:
+    """
+    Look up a cached translation result.
+
+    Args:
+        channel_id: Channel whose conversation the translation used as context
+        text: The message content to translate
+        target_lang: Target language code (None for auto)
+
+    Returns:
+        The cached translation result dict, or None on a miss
+    """
+    return _cache.get(_make_key(channel_id, text, target_lang))
+
+
+def put(
+    channel_id: int,
+    text: str,
+    target_lang: Optional[str],
+    result: Dict[str, Any]
+) -> None:
+    """
+    Store a translation result.
+
+    Results carrying an error are not cached so the next request retries.
+
+    Args:
+        channel_id: Channel whose conversation the translation used as context
+        text: The message content that was translated
+        target_lang: Target language code (None for auto)
+        result: The result dict returned by translate_with_context
+    """
+    if result.get("error"):
+        return
+    _cache[_make_key(channel_id, text, target_lang)] = result
+
+
+def clear() -> None:
+    """Drop all cached translations."""
+    _cache.clear()